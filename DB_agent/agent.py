@@ -3,14 +3,37 @@ Main DB Agent implementation using PydanticAI and PostgreSQL.
 
 This agent can perform CRUD operations on a customers database using natural language commands.
 """
+import asyncio
+import atexit
+import functools
+import importlib.util
+import logging
+import json
 import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
 from dotenv import load_dotenv
 from colorama import Fore, Style, init
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
-from supabase import create_client, Client
-from database import seed_database
-from tools import create_customer, get_customer_by_email, update_customer_by_email, delete_customer_by_email
+from database import close_pool, get_pool, setup_and_seed
+from logging_config import setup_logging
+
+try:
+    # Gives input() line editing and arrow-key history; unavailable on Windows
+    import readline
+except ImportError:
+    readline = None
+
+if TYPE_CHECKING:
+    import asyncpg
+    import httpx
+    from pydantic_ai import Agent
+    from pydantic_ai.models.openai import OpenAIModel
 
 # Initialize colorama for colored terminal output
 init(autoreset=True)
@@ -18,11 +41,27 @@ init(autoreset=True)
 # Load environment variables
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
+# HTTP client shared by the OpenAI model, created by get_openai_model()
+_http_client: Optional["httpx.AsyncClient"] = None
 
-def get_openai_model(model_name: str = "gpt-4o-mini") -> OpenAIModel:
+# REPL prompt, built once instead of on every iteration. readline needs the
+# color codes wrapped in \001...\002 so it doesn't count them as visible width
+if readline is not None:
+    PROMPT = "\001" + Fore.WHITE + "\002" + ">> Enter a query: "
+else:
+    PROMPT = Fore.WHITE + ">> Enter a query: "
+
+
+def get_openai_model(model_name: str = "gpt-4o-mini") -> "OpenAIModel":
     """
     Initialize and return an OpenAI model instance.
     
+    The model talks to the OpenAI API through a single HTTP/2 client, so all
+    requests (including concurrent agent runs) share one TLS connection pool.
+    HTTP/1.1 is used instead if the optional h2 package is not installed.
+    
     Args:
         model_name: Name of the OpenAI model to use
         
@@ -39,27 +78,33 @@ def get_openai_model(model_name: str = "gpt-4o-mini") -> OpenAIModel:
             Fore.RED + "OpenAI API key not found. Please set the OPENAI_API_KEY environment variable."
         )
     
+    import httpx
+    from pydantic_ai.models.openai import OpenAIModel
+
+    global _http_client
     try:
         # Set the API key in environment for PydanticAI to pick up
         os.environ["OPENAI_API_KEY"] = openai_api_key
-        model = OpenAIModel(model_name)
+        # httpx needs the h2 package for HTTP/2 and raises ImportError without it
+        _http_client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+        model = OpenAIModel(model_name, http_client=_http_client)
         return model
     except Exception as e:
-        print(Fore.RED + f"Error initializing OpenAI model: {e}")
+        log.error("Error initializing OpenAI model: %s", e)
         raise
 
 
-def get_supabase_client() -> Client:
+async def close_http_client() -> None:
     """
-    Create and return a Supabase client instance.
+    Close the OpenAI model's HTTP client and its connections.
     """
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
-    
-    if not supabase_url or not supabase_key:
-        raise ValueError("Supabase URL and key must be set in environment variables")
-    
-    return create_client(supabase_url, supabase_key)
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 # System prompt for the agent
@@ -75,48 +120,433 @@ You have access to the following CRUD operations for managing customer records:
 Always be helpful and professional in your responses. When performing operations, provide clear feedback about what was accomplished.
 """
 
-# Initialize the agent with OpenAI model
-model = get_openai_model()
-agent = Agent(
-    model=model,
-    system_prompt=SYSTEM_PROMPT
-)
+# Where the semantic cache persists its index and responses between runs
+CACHE_DIR = Path(__file__).resolve().parent / ".semantic_cache"
+
+# Tools whose results are safe to serve from the response caches (read-only)
+CACHEABLE_TOOLS = frozenset({"get_customer_by_email"})
+
+# Email addresses mentioned in a query; cached lookups are bound to the exact
+# addresses they were answered for
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+# Tools that modify customers; running any of them invalidates the response caches
+WRITE_TOOLS = frozenset({"create_customer", "update_customer_by_email", "delete_customer_by_email"})
+
+# Seconds a cached response may be served; other processes can modify customers
+# without the REPL noticing, so cached answers must not outlive this
+CACHE_TTL = 300.0
+
+# Exact-match response cache checked before the semantic cache, keyed by the
+# normalized query text and ordered from least to most recently used. Values are
+# (response, time cached) pairs
+EXACT_CACHE_SIZE = 256
+_EXACT: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+
+def quantize(q: np.ndarray) -> np.ndarray:
+    """
+    Quantize a unit-length embedding to int8.
+
+    Args:
+        q: Normalized float embedding
+
+    Returns:
+        np.ndarray: Embedding scaled by 127 and rounded to int8
+    """
+    return np.clip(np.round(q * 127), -128, 127).astype(np.int8)
+
+
+class SemanticCache:
+    """
+    Persistent LRU cache of agent responses keyed by the embedding of the user query.
+
+    Queries are embedded with a sentence-transformer model and looked up by
+    cosine similarity in a FAISS HNSW index, so repeated or paraphrased lookups
+    can be answered without calling the LLM. Embeddings are stored as int8
+    (one byte per dimension), which keeps cosine ordering at the similarity
+    thresholds used here while quartering the memory of float32 vectors.
+    Responses, their embeddings and access times live in SQLite next to the
+    index file, so the cache survives restarts of the agent. Entries expire
+    after a fixed time to live, since customers can be modified by other
+    processes.
+
+    Queries about different customers can embed almost identically, so every
+    entry also records the email addresses it was answered for, and a similar
+    query only hits if it asks about exactly the same addresses.
+    """
+
+    # Bumped whenever the responses table changes; older stores are discarded
+    SCHEMA_VERSION = 3
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_DIR,
+        model_name: str = "all-MiniLM-L6-v2",
+        threshold: float = 0.92,
+        max_entries: int = 512,
+        dim: int = 384,
+        flush_every: int = 16,
+        ttl: float = CACHE_TTL,
+    ):
+        """
+        Open the semantic cache, loading any previously persisted entries.
 
-# Register the CRUD tools with the agent
-agent.tool(retries=3)(create_customer)
-agent.tool(retries=3)(get_customer_by_email)
-agent.tool(retries=3)(update_customer_by_email)
-agent.tool(retries=3)(delete_customer_by_email)
+        Args:
+            cache_dir: Directory holding the FAISS index and SQLite response store
+            model_name: Name of the sentence-transformers model used for embeddings
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum number of cached responses before LRU eviction
+            dim: Dimensionality of the embedding model
+            flush_every: Number of new entries between writes of the index to disk
+            ttl: Seconds a cached response may be served after it was stored
+        """
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dim = dim
+        self.flush_every = flush_every
+        self.ttl = ttl
+        self._encoder = None
+        self._pending = 0
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = cache_dir / "cache.faiss"
+        self._db = sqlite3.connect(cache_dir / "cache.sqlite3")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS responses")
+            self._db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                -- AUTOINCREMENT never reuses ids of evicted rows, so a stale
+                -- index file can miss but never map an id to another response
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                response TEXT NOT NULL,
+                emails TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        # Entries left over from earlier runs may have gone stale in the meantime
+        self._expire()
+
+        # Imported lazily; faiss is slow to import and only the REPL uses the cache
+        import faiss
+
+        if self.index_path.exists():
+            self.index = faiss.read_index(str(self.index_path))
+        else:
+            self.index = self._new_index()
+        # The index is only written every few entries; resync if the process
+        # stopped before the last flush
+        if self.index.ntotal != self._count():
+            self._rebuild_index()
+
+        atexit.register(self.flush)
+
+    def _new_index(self):
+        """Create an empty inner-product HNSW index over int8 vectors that accepts explicit ids."""
+        import faiss
+
+        index = faiss.IndexHNSWSQ(self.dim, faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT)
+        # Embeddings are unit length, so every component lies in [-1, 1]; training
+        # on the two corners fixes the same quantization range for all dimensions
+        index.train(np.stack([-np.ones(self.dim), np.ones(self.dim)]).astype(np.float32))
+        return faiss.IndexIDMap2(index)
+
+    def _expire(self) -> int:
+        """
+        Delete responses older than the time to live from SQLite.
+
+        Returns:
+            int: Number of deleted responses; the index must be rebuilt if nonzero
+        """
+        cur = self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        self._db.commit()
+        return cur.rowcount
+
+    def _count(self) -> int:
+        """Return the number of stored responses."""
+        return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _rebuild_index(self) -> None:
+        """Rebuild the index from the embeddings stored in SQLite."""
+        rows = self._db.execute("SELECT id, embedding FROM responses").fetchall()
+        self.index = self._new_index()
+        if rows:
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            E = np.vstack([np.frombuffer(row[1], dtype=np.int8) for row in rows])
+            self.index.add_with_ids(E.astype(np.float32) / 127, ids)
+        self._pending += 1
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a query into a normalized vector.
+
+        Args:
+            text: User query to embed
+
+        Returns:
+            np.ndarray: Unit-length float32 embedding
+        """
+        if self._encoder is None:
+            # Imported lazily; loading torch and the model is expensive
+            from sentence_transformers import SentenceTransformer
+            self._encoder = SentenceTransformer(self.model_name)
+        return self._encoder.encode(text, normalize_embeddings=True).astype(np.float32)
+
+    def lookup(self, q: np.ndarray, emails: list[str]) -> Optional[tuple[str, float]]:
+        """
+        Find a cached response for a query embedding.
+
+        Args:
+            q: Normalized query embedding
+            emails: Email addresses in the query, see query_emails()
+
+        Returns:
+            Optional[tuple[str, float]]: Cached response and the time it was
+                stored if a similar query about the same addresses was seen,
+                None otherwise
+        """
+        if self.index.ntotal == 0:
+            return None
+        D, I = self.index.search(q[None, :], 1)
+        if I[0, 0] < 0 or D[0, 0] < self.threshold:
+            return None
+        key = int(I[0, 0])
+        row = self._db.execute(
+            "SELECT response, created_at, emails FROM responses WHERE id = ?", (key,)
+        ).fetchone()
+        if row is None or json.loads(row[2]) != emails:
+            return None
+        if row[1] < time.time() - self.ttl:
+            # HNSW graphs don't support removal, so drop every expired entry at
+            # once and rebuild rather than keep matching this one
+            if self._expire():
+                self._rebuild_index()
+            return None
+        self._db.execute("UPDATE responses SET last_used = ? WHERE id = ?", (time.time(), key))
+        self._db.commit()
+        return row[0], row[1]
+
+    def add(self, q: np.ndarray, response: str, emails: list[str]) -> None:
+        """
+        Store a response for a query embedding, evicting least recently used entries if full.
+
+        Args:
+            q: Normalized query embedding
+            response: Agent response to cache
+            emails: Email addresses the response was looked up for, see query_emails()
+        """
+        now = time.time()
+        cur = self._db.execute(
+            "INSERT INTO responses (response, emails, embedding, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (response, json.dumps(emails), quantize(q).tobytes(), now, now)
+        )
+        self._db.commit()
+        self.index.add_with_ids(q[None, :], np.array([cur.lastrowid], dtype=np.int64))
+        self._pending += 1
+
+        if self.index.ntotal > self.max_entries:
+            # HNSW graphs don't support removal, so evict a quarter of the
+            # entries at once and rebuild to keep rebuilds rare
+            self._db.execute(
+                "DELETE FROM responses WHERE id IN "
+                "(SELECT id FROM responses ORDER BY last_used LIMIT ?)",
+                (max(1, self.max_entries // 4),)
+            )
+            self._db.commit()
+            self._rebuild_index()
+
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        self._db.execute("DELETE FROM responses")
+        self._db.commit()
+        self.index = self._new_index()
+        self._pending += 1
+        self.flush()
+
+    def flush(self) -> None:
+        """Write the index to disk if it changed since the last flush."""
+        if self._pending:
+            import faiss
+
+            faiss.write_index(self.index, str(self.index_path))
+            self._pending = 0
+
+
+def query_emails(text: str) -> list[str]:
+    """
+    Return the email addresses mentioned in a query.
+
+    Args:
+        text: User query
+
+    Returns:
+        list[str]: Distinct lowercased addresses, sorted
+    """
+    return sorted({email.lower() for email in EMAIL_RE.findall(text)})
+
+
+def tool_calls(result) -> list[tuple[str, dict]]:
+    """
+    Return the tools the agent called during a run and their arguments, in call order.
+
+    Args:
+        result: Result of an agent run
+
+    Returns:
+        list[tuple[str, dict]]: (tool name, arguments) pairs
+    """
+    return [
+        (part.tool_name, part.args_as_dict())
+        for message in result.all_messages()
+        for part in getattr(message, "parts", ())
+        if getattr(part, "part_kind", None) == "tool-call"
+    ]
+
+
+def tool_results(result) -> list:
+    """
+    Return the values the agent's tools returned during a run, in call order.
+
+    Args:
+        result: Result of an agent run
+
+    Returns:
+        list: Tool return values
+    """
+    return [
+        part.content
+        for message in result.all_messages()
+        for part in getattr(message, "parts", ())
+        if getattr(part, "part_kind", None) == "tool-return"
+    ]
+
+
+def _lookup_exact(key: str) -> Optional[str]:
+    """
+    Return a response from the exact-match cache if it has not expired.
+
+    Args:
+        key: Normalized query text
+
+    Returns:
+        Optional[str]: Cached response, or None on a miss
+    """
+    entry = _EXACT.get(key)
+    if entry is None:
+        return None
+    response, cached_at = entry
+    if cached_at < time.time() - CACHE_TTL:
+        del _EXACT[key]
+        return None
+    _EXACT.move_to_end(key)
+    return response
+
+
+def _remember_exact(key: str, response: str, created_at: Optional[float] = None) -> None:
+    """
+    Store a response in the exact-match cache, evicting the least recently used entry if full.
+
+    Args:
+        key: Normalized query text
+        response: Agent response to cache
+        created_at: When the response was produced, if earlier than now; it
+            expires CACHE_TTL after this
+    """
+    _EXACT[key] = (response, time.time() if created_at is None else created_at)
+    _EXACT.move_to_end(key)
+    if len(_EXACT) > EXACT_CACHE_SIZE:
+        _EXACT.popitem(last=False)
+
+
+@functools.cache
+def get_agent() -> "Agent":
+    """
+    Build the DB agent on first use and return the same instance afterwards.
+
+    PydanticAI and the tools are imported here so that importing this module
+    stays cheap for callers that never run the agent.
+
+    Returns:
+        Agent: Agent with the CRUD tools registered
+    """
+    from pydantic_ai import Agent
+    from tools import create_customer, get_customer_by_email, update_customer_by_email, delete_customer_by_email
+
+    agent = Agent(
+        model=get_openai_model(),
+        system_prompt=SYSTEM_PROMPT
+    )
+
+    # Register the CRUD tools with the agent
+    for tool in (create_customer, get_customer_by_email, update_customer_by_email, delete_customer_by_email):
+        agent.tool(retries=3)(tool)
+    return agent
 
 
 def main():
     """
     Main function to run the DB Agent CLI.
+
+    The REPL itself is synchronous and drives each coroutine on one event loop
+    through asyncio.Runner, so Ctrl-C at the prompt raises KeyboardInterrupt
+    from input() instead of being swallowed by asyncio's SIGINT handling.
     """
-    init()  # Initialize colorama
-    
+    setup_logging()
+
     print(f"{Fore.CYAN}🤖 DB Agent - Natural Language Database Interface{Style.RESET_ALL}")
     print(f"{Fore.YELLOW}Type 'quit' or 'exit' to stop the agent.{Style.RESET_ALL}\n")
     
-    # Initialize Supabase client
-    try:
-        supabase_client = get_supabase_client()
-        print(f"{Fore.GREEN}✅ Connected to Supabase successfully!{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}❌ Failed to connect to Supabase: {e}{Style.RESET_ALL}")
-        return
-    
-    # Seed the database with initial data
+    with asyncio.Runner() as runner:
+        # Connect to PostgreSQL
+        try:
+            db_pool = runner.run(get_pool())
+            log.info("✅ Connected to PostgreSQL successfully!")
+        except Exception as e:
+            log.error("❌ Failed to connect to PostgreSQL: %s", e)
+            return
+        
+        # Create the schema and seed the database with initial data
+        if runner.run(setup_and_seed()):
+            log.info("✅ Database seeded successfully!")
+        else:
+            log.warning("⚠️ Database setup and seeding failed")
+
+        try:
+            _repl(runner, db_pool)
+        finally:
+            runner.run(close_pool())
+            runner.run(close_http_client())
+
+
+def _repl(runner: asyncio.Runner, db_pool: "asyncpg.Pool"):
+    """
+    Read queries from the user and answer them with the agent until they quit.
+
+    Args:
+        runner: Runner whose event loop owns the connection pool and agent runs
+        db_pool: Connection pool passed to the tools as run dependencies
+    """
+    agent = get_agent()
+    # The response caches are an optimization; without them every query goes
+    # to the agent
     try:
-        seed_database()
-        print(f"{Fore.GREEN}✅ Database seeded successfully!{Style.RESET_ALL}\n")
+        semantic_cache = SemanticCache()
     except Exception as e:
-        print(f"{Fore.YELLOW}⚠️ Database seeding failed (might already be seeded): {e}{Style.RESET_ALL}\n")
+        log.debug("Semantic cache unavailable: %s", e)
+        semantic_cache = None
 
     # Main interaction loop
     while True:
         try:
-            user_input = input(Fore.WHITE + ">> Enter a query: ").strip()
+            user_input = input(PROMPT).strip()
             
             if user_input.lower() in ["quit", "exit", "q"]:
                 print(Fore.GREEN + "Goodbye! 👋")
@@ -125,21 +555,76 @@ def main():
             if not user_input:
                 continue
             
-            print(Fore.BLUE + "Processing your request...")
+            # Identical queries are answered from the exact-match cache without
+            # computing an embedding
+            key = user_input.lower()
+            cached = _lookup_exact(key)
+            if cached is not None:
+                print(f"{Fore.GREEN}🤖 Agent (cached): {cached}{Style.RESET_ALL}\n")
+                continue
+
+            log.debug("Processing query: %s", user_input)
+            emails = query_emails(user_input)
+            query_embedding = None
+            if semantic_cache is not None:
+                try:
+                    # Serve paraphrased lookups without calling the LLM
+                    query_embedding = semantic_cache.embed(user_input)
+                    hit = semantic_cache.lookup(query_embedding, emails)
+                except Exception as e:
+                    log.debug("Semantic cache lookup failed: %s", e)
+                    hit = None
+                if hit is not None:
+                    cached, created_at = hit
+                    print(f"{Fore.GREEN}🤖 Agent (cached): {cached}{Style.RESET_ALL}\n")
+                    # Keep the semantic entry's age so it is not served past CACHE_TTL
+                    _remember_exact(key, cached, created_at)
+                    continue
+
             try:
                 # Run the agent with the user's query
-                result = agent.run_sync(user_input, deps=supabase_client)
+                result = runner.run(agent.run(user_input, deps=db_pool))
                 print(f"{Fore.GREEN}🤖 Agent: {result.data}{Style.RESET_ALL}\n")
+
+                # Only cache read-only turns that found the customers the query
+                # asked about, and drop everything cached once customers are
+                # modified so lookups never serve stale data
+                calls = tool_calls(result)
+                called = [name for name, _ in calls]
+                looked_up = sorted({str(args.get("email", "")).lower() for _, args in calls})
+                if WRITE_TOOLS.intersection(called):
+                    _EXACT.clear()
+                    if semantic_cache is not None:
+                        try:
+                            semantic_cache.clear()
+                        except Exception as e:
+                            # Entries that may now be stale could not be removed
+                            log.debug("Semantic cache clear failed, disabling it: %s", e)
+                            semantic_cache = None
+                elif (
+                    called
+                    and CACHEABLE_TOOLS.issuperset(called)
+                    and looked_up == emails
+                    and all(value is not None for value in tool_results(result))
+                ):
+                    _remember_exact(key, result.data)
+                    if semantic_cache is not None and query_embedding is not None:
+                        try:
+                            semantic_cache.add(query_embedding, result.data, emails)
+                        except Exception as e:
+                            log.debug("Semantic cache add failed: %s", e)
             except Exception as e:
-                print(f"{Fore.RED}❌ Error: {e}{Style.RESET_ALL}\n")
+                log.error("❌ Error: %s", e)
             except KeyboardInterrupt:
                 print(Fore.YELLOW + "\n\nInterrupted by user. Goodbye! 👋")
                 break
-            except Exception as e:
-                print(Fore.RED + f"❌ An unexpected error occurred: {e}")
             print()  # Add spacing between interactions
+        except (KeyboardInterrupt, EOFError):
+            # Ctrl-C or Ctrl-D at the prompt
+            print(Fore.YELLOW + "\n\nInterrupted by user. Goodbye! 👋")
+            break
         except Exception as e:
-            print(Fore.RED + f"❌ An unexpected error occurred: {e}")
+            log.error("❌ An unexpected error occurred: %s", e)
         print()  # Add spacing between interactions
 
 
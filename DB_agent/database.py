@@ -2,108 +2,150 @@
 Database connection and utility functions for the DB Agent project.
 Simplified version using direct PostgreSQL connection.
 """
+import logging
 import os
-import psycopg2
 from typing import Optional
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
 from dotenv import load_dotenv
-from colorama import Fore
 
+log = logging.getLogger(__name__)
 
-def get_database_connection():
+CREATE_CUSTOMERS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS customers (
+        id SERIAL PRIMARY KEY,
+        email TEXT UNIQUE NOT NULL,
+        full_name TEXT NOT NULL,
+        bio TEXT NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    );
+"""
+
+# Sample customers; existing rows are left untouched
+SEED_CUSTOMERS_SQL = """
+    INSERT INTO customers (email, full_name, bio) VALUES
+        ('johndoe@gmail.com', 'John Doe', 'I am a software engineer'),
+        ('janedoe@gmail.com', 'Jane Doe', 'I am a data scientist'),
+        ('jimdoe@gmail.com', 'Jim Doe', 'I am a product manager')
+    ON CONFLICT (email) DO NOTHING;
+"""
+
+# SQL used by the CRUD tools, prepared once per pooled connection
+CUSTOMER_STATEMENTS = {
+    "get_customer": "SELECT id, email, full_name, bio FROM customers WHERE email = $1",
+    "insert_customer": (
+        "INSERT INTO customers (email, full_name, bio) VALUES ($1, $2, $3) "
+        "RETURNING id, email, full_name, bio"
+    ),
+    "update_customer": (
+        "UPDATE customers SET full_name = $1, bio = $2 WHERE email = $3 "
+        "RETURNING id, email, full_name, bio"
+    ),
+    "delete_customer": "DELETE FROM customers WHERE email = $1 RETURNING id, email, full_name, bio",
+}
+
+# Process-wide asyncpg connection pool, created on first use by get_pool()
+_pool: Optional[asyncpg.Pool] = None
+
+
+class CustomerConnection(asyncpg.Connection):
     """
-    Get a direct PostgreSQL database connection.
-    
-    Returns:
-        psycopg2.connection: Database connection or None if failed
+    asyncpg connection that keeps the CRUD tools' prepared statements.
+
+    Tool calls reuse these statements and only send Bind/Execute, instead of
+    sending the SQL text to be parsed and described again.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements: dict[str, PreparedStatement] = {}
+
+    async def statement(self, name: str) -> PreparedStatement:
+        """
+        Return a statement from CUSTOMER_STATEMENTS, preparing it on first use.
+
+        Args:
+            name: Key of the statement in CUSTOMER_STATEMENTS
+
+        Returns:
+            PreparedStatement: Statement prepared on this connection
+        """
+        stmt = self.statements.get(name)
+        if stmt is None:
+            stmt = self.statements[name] = await self.prepare(CUSTOMER_STATEMENTS[name])
+        return stmt
+
+
+async def _prepare_statements(conn: CustomerConnection) -> None:
+    """
+    Prepare all CRUD statements when the pool opens a new connection.
+
+    Args:
+        conn: Newly opened pool connection
     """
-    load_dotenv()
-    
     try:
-        conn = psycopg2.connect(
+        for name in CUSTOMER_STATEMENTS:
+            await conn.statement(name)
+    except asyncpg.UndefinedTableError:
+        # The schema has not been created yet; statements get prepared on first use
+        pass
+
+
+async def get_pool() -> asyncpg.Pool:
+    """
+    Return the shared asyncpg connection pool, creating it on first use.
+
+    Every pooled connection prepares the CRUD statements when it is opened,
+    see CustomerConnection.
+
+    Returns:
+        asyncpg.Pool: Process-wide PostgreSQL connection pool
+    """
+    global _pool
+    if _pool is None:
+        load_dotenv()
+        _pool = await asyncpg.create_pool(
             host="localhost",
-            port=os.environ.get("POSTGRES_PORT", "5432"),
+            port=int(os.environ.get("POSTGRES_PORT", "5432")),
             database="postgres",
             user="postgres",
-            password=os.environ.get("POSTGRES_PASSWORD")
+            password=os.environ.get("POSTGRES_PASSWORD"),
+            min_size=1,
+            max_size=8,
+            connection_class=CustomerConnection,
+            init=_prepare_statements
         )
-        return conn
-    except Exception as e:
-        print(Fore.RED + f"Error connecting to database: {e}")
-        return None
+    return _pool
 
 
-def setup_database_schema() -> bool:
+async def close_pool() -> None:
     """
-    Create the customers table if it doesn't exist.
-    
-    Returns:
-        bool: True if setup was successful, False otherwise
+    Close the shared connection pool and all of its connections.
     """
-    conn = get_database_connection()
-    if not conn:
-        return False
-        
-    try:
-        with conn.cursor() as cur:
-            # Create customers table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS customers (
-                    id SERIAL PRIMARY KEY,
-                    email TEXT UNIQUE NOT NULL,
-                    full_name TEXT NOT NULL,
-                    bio TEXT NOT NULL,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-                );
-            """)
-            conn.commit()
-            print(Fore.GREEN + "Database schema setup completed!")
-            return True
-            
-    except Exception as e:
-        print(Fore.RED + f"Error setting up database schema: {e}")
-        return False
-    finally:
-        conn.close()
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
 
 
-def seed_database() -> bool:
+async def setup_and_seed() -> bool:
     """
-    Seed the database with sample customer data.
-        
+    Create the customers table if it doesn't exist and seed it with sample customers.
+
+    This is the single entry point for preparing the database. Both statements
+    are sent as one simple-query message, which PostgreSQL runs as a single
+    implicit transaction with one commit.
+
     Returns:
-        bool: True if seeding was successful, False otherwise
+        bool: True if setup and seeding were successful, False otherwise
     """
-    conn = get_database_connection()
-    if not conn:
-        return False
-        
     try:
-        with conn.cursor() as cur:
-            # Check if data already exists
-            cur.execute("SELECT COUNT(*) FROM customers")
-            count = cur.fetchone()[0]
-            
-            if count > 0:
-                print(Fore.YELLOW + "Database already contains data, skipping seed.")
-                return True
-                
-            # Insert sample data
-            sample_customers = [
-                ("johndoe@gmail.com", "John Doe", "I am a software engineer"),
-                ("janedoe@gmail.com", "Jane Doe", "I am a data scientist"),
-                ("jimdoe@gmail.com", "Jim Doe", "I am a product manager"),
-            ]
-            
-            cur.executemany(
-                "INSERT INTO customers (email, full_name, bio) VALUES (%s, %s, %s)",
-                sample_customers
-            )
-            conn.commit()
-            print(Fore.GREEN + f"Successfully seeded database with {len(sample_customers)} customers")
-            return True
-            
+        db_pool = await get_pool()
+        async with db_pool.acquire() as conn:
+            await conn.execute(CREATE_CUSTOMERS_TABLE_SQL + SEED_CUSTOMERS_SQL)
+        log.info("Database schema setup and seeding completed!")
+        return True
+
     except Exception as e:
-        print(Fore.RED + f"Error seeding database: {e}")
+        log.error("Error setting up and seeding database: %s", e)
         return False
-    finally:
-        conn.close()
@@ -0,0 +1,33 @@
+"""
+Logging setup shared by the DB Agent scripts.
+"""
+import logging
+import os
+from colorama import Fore, Style
+
+# Terminal color for each log level
+LEVEL_COLORS = {
+    "DEBUG": Fore.BLUE,
+    "INFO": Fore.GREEN,
+    "WARNING": Fore.YELLOW,
+    "ERROR": Fore.RED,
+    "CRITICAL": Fore.RED,
+}
+
+
+class ColorFormatter(logging.Formatter):
+    """Formatter that colors each record according to its level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return LEVEL_COLORS.get(record.levelname, "") + super().format(record) + Style.RESET_ALL
+
+
+def setup_logging() -> None:
+    """
+    Configure the root logger to write colored messages to stderr.
+
+    The level is read from the LOG_LEVEL environment variable (default INFO).
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(ColorFormatter("%(message)s"))
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), handlers=[handler])
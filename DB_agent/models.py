@@ -5,10 +5,10 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Customer:
     """Customer data model for the database agent."""
-    id: Optional[str] = None
+    id: Optional[int] = None
     email: str = ""
     full_name: str = ""
     bio: str = ""
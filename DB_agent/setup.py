@@ -3,36 +3,44 @@ Setup script for the DB Agent project.
 
 This script helps users set up the project environment and dependencies.
 """
+import logging
 import os
+import shutil
 import subprocess
 import sys
-from colorama import Fore, init
+from colorama import init
+from logging_config import setup_logging
 
 # Initialize colorama
 init(autoreset=True)
 
+log = logging.getLogger(__name__)
+
 
 def run_command(command, description, check_success=True):
-    """Run a shell command and handle errors."""
-    print(f"{Fore.BLUE}📋 {description}...")
+    """Run a command (given as an argument list, without a shell) and handle errors."""
+    log.info("📋 %s...", description)
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
+        # Without a shell, Windows only finds .exe files; resolve .cmd shims
+        # such as npm and npx through PATH first
+        command = [shutil.which(command[0]) or command[0], *command[1:]]
+        result = subprocess.run(command, capture_output=True, text=True)
         if check_success and result.returncode != 0:
-            print(f"{Fore.RED}❌ Failed: {result.stderr}")
+            log.error("❌ Failed: %s", result.stderr)
             return False
         else:
-            print(f"{Fore.GREEN}✅ Success!")
+            log.info("✅ Success!")
             if result.stdout.strip():
-                print(f"{Fore.YELLOW}{result.stdout.strip()}")
+                log.debug("%s", result.stdout.strip())
             return True
     except Exception as e:
-        print(f"{Fore.RED}❌ Error: {e}")
+        log.error("❌ Error: %s", e)
         return False
 
 
 def check_prerequisites():
     """Check if required tools are installed."""
-    print(f"{Fore.CYAN}🔍 Checking prerequisites...")
+    log.info("🔍 Checking prerequisites...")
     
     prerequisites = [
         ("python3", "Python 3.13+"),
@@ -42,34 +50,32 @@ def check_prerequisites():
         ("npm", "npm")
     ]
     
-    missing = []
-    for cmd, name in prerequisites:
-        if not run_command(f"which {cmd}", f"Checking {name}", check_success=False):
-            missing.append(name)
+    # Look each tool up on PATH directly instead of spawning `which`
+    missing = [name for cmd, name in prerequisites if shutil.which(cmd) is None]
     
     if missing:
-        print(f"{Fore.RED}❌ Missing prerequisites: {', '.join(missing)}")
-        print(f"{Fore.YELLOW}Please install the missing tools and run this script again.")
+        log.error("❌ Missing prerequisites: %s", ", ".join(missing))
+        log.warning("Please install the missing tools and run this script again.")
         return False
     
-    print(f"{Fore.GREEN}✅ All prerequisites are installed!")
+    log.info("✅ All prerequisites are installed!")
     return True
 
 
 def setup_environment():
     """Set up the project environment."""
-    print(f"\n{Fore.CYAN}🛠️  Setting up project environment...")
+    log.info("🛠️  Setting up project environment...")
     
     # Install dependencies
-    if not run_command("uv sync", "Installing Python dependencies"):
+    if not run_command(["uv", "sync"], "Installing Python dependencies"):
         return False
     
     # Check if .env file exists
     if not os.path.exists(".env"):
-        print(f"{Fore.YELLOW}⚠️  .env file not found. Please:")
-        print(f"{Fore.YELLOW}   1. Copy .env.example to .env")
-        print(f"{Fore.YELLOW}   2. Add your OpenAI API key")
-        print(f"{Fore.YELLOW}   3. Add your Supabase URL and key after running 'npx supabase start'")
+        log.warning("⚠️  .env file not found. Please:")
+        log.warning("   1. Copy .env.example to .env")
+        log.warning("   2. Add your OpenAI API key")
+        log.warning("   3. Add your Supabase URL and key after running 'npx supabase start'")
         return False
     
     return True
@@ -77,31 +83,31 @@ def setup_environment():
 
 def setup_supabase():
     """Set up Supabase local instance."""
-    print(f"\n{Fore.CYAN}🗄️  Setting up Supabase...")
+    log.info("🗄️  Setting up Supabase...")
     
     # Install Supabase CLI locally
-    if not run_command("npm install supabase --save-dev", "Installing Supabase CLI"):
+    if not run_command(["npm", "install", "supabase", "--save-dev"], "Installing Supabase CLI"):
         return False
     
     # Initialize Supabase project if not already done
     if not os.path.exists("supabase"):
-        if not run_command("npx supabase init", "Initializing Supabase project"):
+        if not run_command(["npx", "supabase", "init"], "Initializing Supabase project"):
             return False
     
-    print(f"{Fore.YELLOW}📝 Next steps for Supabase:")
-    print(f"{Fore.YELLOW}   1. Run: npx supabase start")
-    print(f"{Fore.YELLOW}   2. Copy the API URL and anon key to your .env file")
-    print(f"{Fore.YELLOW}   3. Open Supabase Studio and create the 'customers' table")
-    print(f"{Fore.YELLOW}   4. Add columns: full_name (text), email (text, unique), bio (text)")
-    print(f"{Fore.YELLOW}   5. Disable Row Level Security for development")
+    log.info("📝 Next steps for Supabase:")
+    log.info("   1. Run: npx supabase start")
+    log.info("   2. Copy the API URL and anon key to your .env file")
+    log.info("   3. Open Supabase Studio and create the 'customers' table")
+    log.info("   4. Add columns: full_name (text), email (text, unique), bio (text)")
+    log.info("   5. Disable Row Level Security for development")
     
     return True
 
 
 def main():
     """Main setup function."""
-    print(f"{Fore.CYAN}🚀 DB Agent Setup Script")
-    print(f"{Fore.CYAN}=" * 40)
+    log.info("🚀 DB Agent Setup Script")
+    log.info("=" * 40)
     
     if not check_prerequisites():
         sys.exit(1)
@@ -112,12 +118,13 @@ def main():
     if not setup_supabase():
         sys.exit(1)
     
-    print(f"\n{Fore.GREEN}🎉 Setup completed successfully!")
-    print(f"{Fore.GREEN}Next steps:")
-    print(f"{Fore.YELLOW}   1. Complete the Supabase setup as described above")
-    print(f"{Fore.YELLOW}   2. Run: uv run python agent.py")
-    print(f"{Fore.YELLOW}   3. Or test with: uv run python test_agent.py")
+    log.info("🎉 Setup completed successfully!")
+    log.info("Next steps:")
+    log.info("   1. Complete the Supabase setup as described above")
+    log.info("   2. Run: uv run python agent.py")
+    log.info("   3. Or test with: uv run python test_agent.py")
 
 
 if __name__ == "__main__":
+    setup_logging()
     main()
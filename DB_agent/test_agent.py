@@ -5,91 +5,129 @@ This script tests the agent's ability to handle various natural language command
 for database operations without requiring manual input.
 """
 import asyncio
-from colorama import Fore, init
-from database import get_supabase_client, seed_database
-from agent import agent
+import logging
+from colorama import init
+from database import close_pool, get_pool, setup_and_seed
+from agent import close_http_client, get_agent
+from logging_config import setup_logging
 
 # Initialize colorama
 init(autoreset=True)
 
+log = logging.getLogger(__name__)
 
-def test_agent_operations():
+
+async def run_agent_operations():
     """
     Test the agent with various CRUD operations.
+    
+    Test cases are grouped into dependency batches; the queries within a batch
+    are independent and run concurrently, and batches run in order.
     """
-    print(Fore.CYAN + "🧪 Testing DB Agent CRUD Operations")
-    print(Fore.CYAN + "=" * 50)
+    log.info("🧪 Testing DB Agent CRUD Operations")
+    log.info("=" * 50)
     
-    # Initialize Supabase client
-    supabase_client = get_supabase_client()
-    if not supabase_client:
-        print(Fore.RED + "❌ Failed to initialize Supabase client")
+    # Initialize the database connection pool
+    try:
+        db_pool = await get_pool()
+    except Exception as e:
+        log.error("❌ Failed to connect to PostgreSQL: %s", e)
         return False
     
     # Seed the database
-    print(Fore.BLUE + "📊 Seeding database...")
-    seed_database(supabase_client)
+    log.info("📊 Setting up and seeding database...")
+    await setup_and_seed()
     
-    # Test cases
-    test_cases = [
-        {
-            "description": "Retrieve existing customer",
-            "query": "Get the customer with email johndoe@gmail.com"
-        },
-        {
-            "description": "Create new customer",
-            "query": "Create a new customer with email test@example.com, name Test User, and bio 'Test customer for validation'"
-        },
-        {
+    agent = get_agent()
+    
+    # Test cases, grouped into batches that can run concurrently
+    test_batches = [
+        [
+            {
+                "description": "Retrieve existing customer",
+                "query": "Get the customer with email johndoe@gmail.com"
+            },
+            {
+                "description": "Create new customer",
+                "query": "Create a new customer with email test@example.com, name Test User, and bio 'Test customer for validation'"
+            },
+        ],
+        [{
             "description": "Retrieve newly created customer",
             "query": "Get the customer with email test@example.com"
-        },
-        {
+        }],
+        [{
             "description": "Update customer information",
             "query": "Update the customer test@example.com with name 'Updated Test User' and bio 'Updated bio for testing'"
-        },
-        {
+        }],
+        [{
             "description": "Retrieve updated customer",
             "query": "Get the customer with email test@example.com"
-        },
-        {
+        }],
+        [{
             "description": "Delete customer",
             "query": "Delete the customer with email test@example.com"
-        },
-        {
+        }],
+        [{
             "description": "Try to retrieve deleted customer (should fail)",
             "query": "Get the customer with email test@example.com"
-        }
+        }]
     ]
+    test_cases = [test_case for batch in test_batches for test_case in batch]
     
     success_count = 0
+    i = 0
     
-    for i, test_case in enumerate(test_cases, 1):
-        print(f"\n{Fore.YELLOW}Test {i}: {test_case['description']}")
-        print(f"{Fore.WHITE}Query: {test_case['query']}")
-        
-        try:
-            # Use run_sync for synchronous execution
-            result = agent.run_sync(test_case['query'], deps=supabase_client)
-            print(f"{Fore.GREEN}✅ Result: {result.data}")
-            success_count += 1
-        except Exception as e:
-            if "No customer found" in str(e) and "should fail" in test_case['description']:
-                print(f"{Fore.GREEN}✅ Expected failure: {e}")
-                success_count += 1
-            else:
-                print(f"{Fore.RED}❌ Error: {e}")
+    try:
+        for batch in test_batches:
+            # Overlap the LLM latency of independent queries
+            results = await asyncio.gather(
+                *(agent.run(test_case['query'], deps=db_pool) for test_case in batch),
+                return_exceptions=True
+            )
+            
+            for test_case, result in zip(batch, results):
+                i += 1
+                log.info("Test %d: %s", i, test_case['description'])
+                log.info("Query: %s", test_case['query'])
+                
+                if not isinstance(result, Exception):
+                    log.info("✅ Result: %s", result.data)
+                    success_count += 1
+                elif "No customer found" in str(result) and "should fail" in test_case['description']:
+                    log.info("✅ Expected failure: %s", result)
+                    success_count += 1
+                else:
+                    log.error("❌ Error: %s", result)
+    finally:
+        await close_pool()
+        await close_http_client()
     
-    print(f"\n{Fore.CYAN}=" * 50)
-    print(f"{Fore.CYAN}Test Results: {success_count}/{len(test_cases)} tests passed")
+    log.info("=" * 50)
+    log.info("Test Results: %d/%d tests passed", success_count, len(test_cases))
     
     if success_count == len(test_cases):
-        print(f"{Fore.GREEN}🎉 All tests passed! The DB Agent is working correctly.")
+        log.info("🎉 All tests passed! The DB Agent is working correctly.")
         return True
     else:
-        print(f"{Fore.RED}⚠️  Some tests failed. Please check the configuration.")
+        log.warning("⚠️  Some tests failed. Please check the configuration.")
         return False
 
 
+def test_agent_operations():
+    """
+    Run the CRUD operation tests to completion.
+
+    Returns:
+        bool: True if all tests passed, False otherwise
+    """
+    return asyncio.run(run_agent_operations())
+
+
+# This is a script against a live database and OpenAI, not a pytest test
+test_agent_operations.__test__ = False
+
+
 if __name__ == "__main__":
+    setup_logging()
     test_agent_operations()
@@ -1,26 +1,25 @@
 """
 Create operation tool for the DB Agent.
 """
+import asyncpg
 from pydantic_ai import RunContext
-from supabase import Client
+from models import Customer
 
 
-async def create_customer(ctx: RunContext[Client], email: str, full_name: str, bio: str):
+async def create_customer(ctx: RunContext[asyncpg.Pool], email: str, full_name: str, bio: str):
     """
     Create a new customer record in the database.
     
     Args:
-        ctx: PydanticAI run context with Supabase client
+        ctx: PydanticAI run context with asyncpg connection pool
         email: Customer email address
         full_name: Customer's full name
         bio: Customer biography/description
         
     Returns:
-        dict: Response from Supabase insert operation
+        Customer: The newly created customer record
     """
-    response = (
-        ctx.deps.table("customers")
-        .insert({"email": email, "full_name": full_name, "bio": bio})
-        .execute()
-    )
-    return response
+    async with ctx.deps.acquire() as conn:
+        stmt = await conn.statement("insert_customer")
+        row = await stmt.fetchrow(email, full_name, bio)
+    return Customer(**row)
@@ -1,20 +1,23 @@
 """
 Delete operation tool for the DB Agent.
 """
+import asyncpg
 from pydantic_ai import RunContext
-from supabase import Client
+from models import Customer
 
 
-async def delete_customer_by_email(ctx: RunContext[Client], email: str):
+async def delete_customer_by_email(ctx: RunContext[asyncpg.Pool], email: str):
     """
     Delete a customer record from their email address.
     
     Args:
-        ctx: PydanticAI run context with Supabase client
+        ctx: PydanticAI run context with asyncpg connection pool
         email: Customer email address to delete
         
     Returns:
-        dict: Response from Supabase delete operation
+        Customer: The deleted customer record, or None if no customer was found
     """
-    response = ctx.deps.table("customers").delete().eq("email", email).execute()
-    return response
+    async with ctx.deps.acquire() as conn:
+        stmt = await conn.statement("delete_customer")
+        row = await stmt.fetchrow(email)
+    return Customer(**row) if row else None
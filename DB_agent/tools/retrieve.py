@@ -1,25 +1,23 @@
 """
 Retrieve operation tool for the DB Agent.
 """
+import asyncpg
 from pydantic_ai import RunContext
-from supabase import Client
+from models import Customer
 
 
-async def get_customer_by_email(ctx: RunContext[Client], email: str):
+async def get_customer_by_email(ctx: RunContext[asyncpg.Pool], email: str):
     """
     Retrieve a customer record by their email address.
     
     Args:
-        ctx: PydanticAI run context with Supabase client
+        ctx: PydanticAI run context with asyncpg connection pool
         email: Customer email address to search for
         
     Returns:
-        dict: Response from Supabase select operation
+        Customer: The matching customer record, or None if no customer was found
     """
-    response = (
-        ctx.deps.table("customers")
-        .select("*")
-        .eq("email", email)
-        .execute()
-    )
-    return response
+    async with ctx.deps.acquire() as conn:
+        stmt = await conn.statement("get_customer")
+        row = await stmt.fetchrow(email)
+    return Customer(**row) if row else None
@@ -1,27 +1,25 @@
 """
 Update operation tool for the DB Agent.
 """
+import asyncpg
 from pydantic_ai import RunContext
-from supabase import Client
+from models import Customer
 
 
-async def update_customer_by_email(ctx: RunContext[Client], email: str, full_name: str, bio: str):
+async def update_customer_by_email(ctx: RunContext[asyncpg.Pool], email: str, full_name: str, bio: str):
     """
     Update a customer record from their email address.
     
     Args:
-        ctx: PydanticAI run context with Supabase client
+        ctx: PydanticAI run context with asyncpg connection pool
         email: Customer email address to update
         full_name: New full name for the customer
         bio: New biography/description for the customer
         
     Returns:
-        dict: Response from Supabase update operation
+        Customer: The updated customer record, or None if no customer was found
     """
-    response = (
-        ctx.deps.table("customers")
-        .update({"full_name": full_name, "bio": bio})
-        .eq("email", email)
-        .execute()
-    )
-    return response
+    async with ctx.deps.acquire() as conn:
+        stmt = await conn.statement("update_customer")
+        row = await stmt.fetchrow(full_name, bio, email)
+    return Customer(**row) if row else None
@@ -4,24 +4,183 @@ OAuth2 authentication helper for Google Cloud services.
 This handles the OAuth flow for accessing Vertex AI with LangExtract.
 """
 
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import errno
+import functools
+import logging
 import os
 import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Tuple
 
-try:
+# The Google auth libraries pull in requests, urllib3 and cryptography, so they
+# are imported where they are first needed rather than at module load.
+# Install them with: uv add google-auth google-auth-oauthlib google-auth-httplib2
+if TYPE_CHECKING:
     from google.auth.transport.requests import Request
     from google.oauth2.credentials import Credentials
-    from google_auth_oauthlib.flow import InstalledAppFlow
+
+try:
+    import orjson
+
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
 except ImportError:
-    print("❌ Google auth libraries not installed. Run: uv add google-auth google-auth-oauthlib google-auth-httplib2")
-    exit(1)
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    _json_loads = json.loads
+
+log = logging.getLogger(__name__)
 
 # Scopes required for Vertex AI access
-SCOPES = [
+SCOPES: Tuple[str, ...] = (
     'https://www.googleapis.com/auth/cloud-platform',
     'https://www.googleapis.com/auth/generative-language'
-]
+)
+
+# Credentials are refreshed, and cached ones reused, only while they stay valid
+# for at least this long
+EXPIRY_BUFFER = timedelta(minutes=5)
+
+# After a failed refresh, credentials that are still valid are reused as they
+# are for this long instead of retrying the token endpoint on every call
+REFRESH_BACKOFF = timedelta(minutes=1)
+
+# Credentials shared by all helpers in the process, keyed by resolved token file
+# path, along with the (mtime_ns, size) of the token file they were read from
+# or last saved to
+_credentials_cache: Dict[str, Credentials] = {}
+_token_stats: Dict[str, Tuple[int, int]] = {}
+# time.monotonic() of the last failed refresh, keyed like the caches above
+_refresh_failures: Dict[str, float] = {}
+_credentials_lock = threading.Lock()
+
+
+def _stat_key(path: Path) -> Tuple[int, int]:
+    """Return the (mtime_ns, size) pair used to detect changes to a file."""
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+@functools.lru_cache(maxsize=1)
+def _auth_request() -> Request:
+    """Return a shared transport so token refreshes reuse one HTTP session."""
+    from google.auth.transport.requests import Request
+
+    return Request()
+
+
+def _is_fresh(creds: Credentials) -> bool:
+    """Check that credentials are valid and not within EXPIRY_BUFFER of expiring."""
+    if not creds.valid:
+        return False
+    if creds.expiry is None:
+        return True
+    # google-auth stores expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now > EXPIRY_BUFFER
+
+
+def _serialize(creds: Credentials) -> bytes:
+    """Encode credentials for token.json with the same fields as Credentials.to_json()."""
+    scopes = creds.scopes
+    expiry = creds.expiry
+    data = {
+        "token": creds.token,
+        "refresh_token": creds.refresh_token,
+        "token_uri": creds.token_uri,
+        "client_id": creds.client_id,
+        "client_secret": creds.client_secret,
+        "scopes": list(scopes) if scopes is not None else None,
+        # Needed to refresh tokens of accounts under reauth policies
+        "rapt_token": creds.rapt_token,
+        # Not available in older google-auth releases
+        "universe_domain": getattr(creds, "universe_domain", None),
+        "account": getattr(creds, "account", None),
+        # Naive UTC with a Z suffix
+        "expiry": expiry.isoformat() + "Z" if expiry else None,
+    }
+    # Fields that are not set are left out
+    return _json_dumps({key: value for key, value in data.items() if value is not None})
+
+
+def _backing_off(failed_at: Optional[float]) -> bool:
+    """Check whether a refresh that failed at failed_at is within REFRESH_BACKOFF."""
+    return (
+        failed_at is not None
+        and time.monotonic() - failed_at < REFRESH_BACKOFF.total_seconds()
+    )
+
+
+def _credential_state(creds: Optional[Credentials], backing_off: bool = False) -> int:
+    """
+    Classify credentials for OAuthHelper's load/refresh/save path.
+
+    Returns 0 if there are none, 1 if they can be used as-is, 2 if they should
+    be refreshed, and 3 if the user has to re-authorize. While backing_off after
+    a failed refresh, credentials that are still valid are not refreshed again.
+    """
+    if creds is None:
+        return 0
+    if _is_fresh(creds):
+        return 1
+    if creds.refresh_token and not (backing_off and creds.valid):
+        return 2
+    # Without a refresh token, a token inside EXPIRY_BUFFER is used until it expires
+    return 1 if creds.valid else 3
+
+
+@contextlib.contextmanager
+def _exclusive_lock(lock_file: Path) -> Iterator[None]:
+    """
+    Hold an exclusive OS-level advisory lock on lock_file for the duration of the block.
+
+    If the lock file cannot be opened, e.g. in a read-only project directory,
+    the block runs without the lock.
+    """
+    try:
+        fh = open(lock_file, "a+b")
+    except OSError as e:
+        log.debug("Cannot open lock file %s, continuing without it: %s", lock_file, e)
+        yield
+        return
+    
+    with fh:
+        if os.name == "nt":
+            import msvcrt
+
+            # msvcrt locks byte ranges; lock the first byte of the file
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError as e:
+                    # LK_LOCK gives up after about 10 seconds, but the holder may
+                    # be waiting on the user in the interactive OAuth flow
+                    if e.errno != errno.EDEADLOCK:
+                        raise
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
 
 class OAuthHelper:
     """Helper class for managing OAuth2 authentication with Google Cloud."""
@@ -31,71 +190,203 @@ class OAuthHelper:
         self.project_root = Path(project_root)
         self.credentials_file = self.project_root / "credentials.json"
         self.token_file = self.project_root / "token.json"
+        self.lock_file = self.project_root / "token.json.lock"
+        # String forms of the paths, computed once instead of on every call
+        self._credentials_path_str = os.fspath(self.credentials_file)
+        self._token_path_str = os.fspath(self.token_file)
+        self._cache_key = str(self.token_file.resolve())
+        # Created on first use by get_credentials_async
+        self._refresh_lock: Optional[asyncio.Lock] = None
+    
+    def _check_cache(self) -> Tuple[bool, Optional[Credentials], Optional[Tuple[int, int]]]:
+        """
+        Look up the credentials already loaded in this process.
+
+        Returns (hit, cached, cached_stat): whether the cached credentials can
+        be reused as they are, the credentials themselves, and the stat of the
+        token.json they match. Valid credentials inside EXPIRY_BUFFER count as a
+        hit while backing off from a failed refresh.
+        """
+        with _credentials_lock:
+            cached = _credentials_cache.get(self._cache_key)
+            cached_stat = _token_stats.get(self._cache_key)
+            failed_at = _refresh_failures.get(self._cache_key)
+        hit = cached is not None and (
+            _is_fresh(cached) or (cached.valid and _backing_off(failed_at))
+        )
+        return hit, cached, cached_stat
     
     def get_credentials(self) -> Optional[Credentials]:
         """Get valid OAuth2 credentials, refreshing or creating as needed."""
+        # Reuse credentials already loaded in this process while they stay fresh
+        hit, cached, cached_stat = self._check_cache()
+        if hit:
+            return cached
+        
+        # Processes sharing token.json take turns on the slow path, so only one
+        # of them refreshes; the others then load the token it saved
+        with _exclusive_lock(self.lock_file):
+            return self._load_refresh_save(self._cache_key, cached, cached_stat)
+    
+    async def get_credentials_async(self) -> Optional[Credentials]:
+        """
+        Get valid OAuth2 credentials without blocking the event loop.
+
+        Concurrent callers share a single load/refresh. The asyncio.Lock that
+        coalesces them is created on first use, which ties the helper to the
+        event loop of its first caller; use a separate helper per event loop.
+        """
+        hit, cached, _ = self._check_cache()
+        if hit:
+            return cached
+        
+        # Concurrent callers wait for a single refresh instead of each hitting
+        # the token endpoint; the blocking load/refresh/save runs in a worker thread
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            hit, cached, _ = self._check_cache()
+            if hit:
+                return cached
+            return await asyncio.to_thread(self.get_credentials)
+    
+    def _load_refresh_save(
+        self,
+        cache_key: str,
+        cached: Optional[Credentials],
+        cached_stat: Optional[Tuple[int, int]],
+    ) -> Optional[Credentials]:
+        """Load token.json, refresh or re-authorize if needed, and save the result."""
+        from google.oauth2.credentials import Credentials
+
         creds = None
+
+        # Load existing token if available; the stat() doubles as the existence check
+        try:
+            token_stat = _stat_key(self.token_file)
+        except FileNotFoundError:
+            token_stat = None
         
-        # Load existing token if available
-        if self.token_file.exists():
+        if token_stat is not None and cached is not None and token_stat == cached_stat:
+            # token.json is unchanged since it was last read or written;
+            # one stat() replaces re-reading and re-parsing it
+            creds = cached
+        elif token_stat is not None:
             try:
-                creds = Credentials.from_authorized_user_file(str(self.token_file), SCOPES)
-                print("✅ Loaded existing OAuth credentials")
+                # Read the whole file at once and parse it ourselves rather than
+                # letting from_authorized_user_file stream it through json.load
+                info = _json_loads(self.token_file.read_bytes())
+                creds = Credentials.from_authorized_user_info(info, SCOPES)
+                log.debug("Loaded existing OAuth credentials")
+            except FileNotFoundError:
+                creds = None
             except Exception as e:
-                print(f"⚠️  Error loading existing credentials: {e}")
+                log.warning("Error loading existing credentials: %s", e)
                 creds = None
         
-        # If there are no valid credentials available, let the user log in
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                try:
-                    creds.refresh(Request())
-                    print("✅ Refreshed OAuth credentials")
-                except Exception as e:
-                    print(f"⚠️  Error refreshing credentials: {e}")
-                    creds = None
-            
-            if not creds:
-                creds = self._run_oauth_flow()
+        # Refresh ahead of expiry so callers never pay for a refresh on an
+        # already-expired token; if there are no usable credentials, let the user log in
+        handler = (self._reauth, self._noop, self._refresh, self._reauth)[
+            _credential_state(creds, self._refresh_backing_off())
+        ]
+        creds, mutated = handler(creds)
         
-        # Save the credentials for the next run
+        # Save refreshed or newly issued credentials for the next run; credentials
+        # loaded as-is are already on disk, as recorded by token_stat
         if creds:
-            self._save_credentials(creds)
+            if mutated:
+                self._save_credentials(creds)
+                try:
+                    token_stat = _stat_key(self.token_file)
+                except OSError:
+                    token_stat = None
+            with _credentials_lock:
+                _credentials_cache[cache_key] = creds
+                if token_stat is None:
+                    _token_stats.pop(cache_key, None)
+                else:
+                    _token_stats[cache_key] = token_stat
             return creds
         
         return None
     
+    def _noop(self, creds: Credentials) -> Tuple[Credentials, bool]:
+        """Keep credentials that are fresh, or still valid with no way to refresh them."""
+        return creds, False
+    
+    def _refresh_backing_off(self) -> bool:
+        """Check whether the last refresh of this helper's token failed within REFRESH_BACKOFF."""
+        with _credentials_lock:
+            failed_at = _refresh_failures.get(self._cache_key)
+        return _backing_off(failed_at)
+    
+    def _refresh(self, creds: Credentials) -> Tuple[Optional[Credentials], bool]:
+        """Refresh credentials, re-authorizing if they can no longer be used."""
+        try:
+            creds.refresh(_auth_request())
+            log.debug("Refreshed OAuth credentials")
+            with _credentials_lock:
+                _refresh_failures.pop(self._cache_key, None)
+            return creds, True
+        except Exception as e:
+            log.warning("Error refreshing credentials: %s", e)
+            with _credentials_lock:
+                _refresh_failures[self._cache_key] = time.monotonic()
+        # Keep using the current token if it has not expired yet
+        if creds.valid:
+            return creds, False
+        return self._reauth(creds)
+    
+    def _reauth(self, creds: Optional[Credentials]) -> Tuple[Optional[Credentials], bool]:
+        """Replace missing or unusable credentials by running the OAuth flow."""
+        return self._run_oauth_flow(), True
+    
     def _run_oauth_flow(self) -> Optional[Credentials]:
         """Run the OAuth2 flow to get new credentials."""
-        if not self.credentials_file.exists():
-            print(f"❌ Credentials file not found: {self.credentials_file}")
-            print("Please download your OAuth2 credentials from Google Cloud Console:")
-            print("https://console.cloud.google.com/apis/credentials")
-            return None
-        
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
         try:
-            print("🔐 Starting OAuth2 flow...")
-            print("A browser window will open for authentication.")
-            
             flow = InstalledAppFlow.from_client_secrets_file(
-                str(self.credentials_file), SCOPES
+                self._credentials_path_str, SCOPES
+            )
+        except FileNotFoundError:
+            log.error(
+                "Credentials file not found: %s. Please download your OAuth2 credentials "
+                "from Google Cloud Console: https://console.cloud.google.com/apis/credentials",
+                self.credentials_file,
             )
+            return None
+        except Exception as e:
+            log.error("OAuth2 flow failed: %s", e)
+            return None
+        
+        try:
+            log.info("Starting OAuth2 flow; a browser window will open for authentication")
             creds = flow.run_local_server(port=0)
-            print("✅ OAuth2 authentication completed!")
+            log.info("OAuth2 authentication completed")
             return creds
             
         except Exception as e:
-            print(f"❌ OAuth2 flow failed: {e}")
+            log.error("OAuth2 flow failed: %s", e)
             return None
     
     def _save_credentials(self, creds: Credentials) -> None:
         """Save credentials to token file."""
         try:
-            with open(self.token_file, 'w') as token:
-                token.write(creds.to_json())
-            print(f"✅ Credentials saved to {self.token_file}")
+            # Write the serialized token with a single unbuffered write to a
+            # temporary file readable by the owner only, then swap it into place
+            # so a crash mid-write never leaves a truncated token.json behind
+            payload = _serialize(creds)
+            tmp_file = self.token_file.with_suffix(".json.tmp")
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                os.write(fd, payload)
+            finally:
+                os.close(fd)
+            os.replace(tmp_file, self.token_file)
+            log.debug("Credentials saved to %s", self.token_file)
         except Exception as e:
-            print(f"⚠️  Error saving credentials: {e}")
+            log.warning("Error saving credentials: %s", e)
     
     def setup_environment(self) -> bool:
         """Set up environment variables for Google Cloud authentication."""
@@ -104,20 +395,25 @@ class OAuthHelper:
             return False
         
         # Set environment variable for Google Cloud authentication
-        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = str(self.token_file)
-        print("✅ Environment configured for Google Cloud authentication")
+        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = self._token_path_str
+        log.debug("Environment configured for Google Cloud authentication")
         return True
     
     def clear_credentials(self) -> None:
         """Clear stored credentials (for troubleshooting)."""
-        if self.token_file.exists():
+        with _credentials_lock:
+            _credentials_cache.pop(self._cache_key, None)
+            _token_stats.pop(self._cache_key, None)
+            _refresh_failures.pop(self._cache_key, None)
+        try:
             self.token_file.unlink()
-            print("✅ Cleared stored credentials")
-        else:
-            print("ℹ️  No stored credentials to clear")
+            log.info("Cleared stored credentials")
+        except FileNotFoundError:
+            log.info("No stored credentials to clear")
 
 def main():
     """Test the OAuth helper."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("🧪 Testing OAuth2 setup...")
     helper = OAuthHelper()
     
@@ -2,9 +2,9 @@
 Tests for configuration module.
 """
 
-import os
+from typing import Dict
+
 import pytest
-from unittest.mock import patch
 
 from src.codescribe.config import Config
 
@@ -19,23 +19,31 @@ class TestConfig:
         assert config.DEBUG is False
         assert config.LOG_LEVEL == "INFO"
     
-    @patch.dict(os.environ, {"DEBUG": "true", "LOG_LEVEL": "DEBUG"})
-    def test_environment_override(self) -> None:
+    def test_environment_override(self, monkeypatch: pytest.MonkeyPatch) -> None:
         """Test environment variable overrides."""
+        monkeypatch.setenv("DEBUG", "true")
+        monkeypatch.setenv("LOG_LEVEL", "DEBUG")
         config = Config()
         assert config.DEBUG is True
         assert config.LOG_LEVEL == "DEBUG"
     
-    def test_validate_missing_api_key(self) -> None:
-        """Test validation with missing API key."""
-        with patch.dict(os.environ, {"GOOGLE_API_KEY": ""}, clear=True):
-            config = Config()
+    @pytest.mark.parametrize(
+        "env, should_raise",
+        [
+            ({"GOOGLE_API_KEY": ""}, True),
+            ({"GOOGLE_API_KEY": "test-key"}, False),
+        ],
+    )
+    def test_validate(
+        self, monkeypatch: pytest.MonkeyPatch, env: Dict[str, str], should_raise: bool
+    ) -> None:
+        """Test validation with the API key missing or present."""
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        config = Config()
+        if should_raise:
             with pytest.raises(ValueError, match="GOOGLE_API_KEY environment variable is required"):
                 config.validate()
-    
-    @patch.dict(os.environ, {"GOOGLE_API_KEY": "test-key"})
-    def test_validate_with_api_key(self) -> None:
-        """Test validation with API key present."""
-        config = Config()
-        # Should not raise an exception
-        config.validate()
+        else:
+            # Should not raise an exception
+            config.validate()
@@ -0,0 +1,271 @@
+"""
+Tests for OAuth helper module.
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+from src.codescribe import oauth_helper
+from src.codescribe.oauth_helper import (
+    SCOPES,
+    OAuthHelper,
+    _credential_state,
+    _exclusive_lock,
+    _json_loads,
+    _serialize,
+)
+
+
+def _utcnow() -> datetime:
+    """Return the current time as naive UTC, the way google-auth stores expiry."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _creds(
+    valid: bool = True,
+    expires_in: Optional[timedelta] = None,
+    refresh_token: Optional[str] = None,
+) -> SimpleNamespace:
+    """Build a stand-in for google.oauth2.credentials.Credentials."""
+    expiry = _utcnow() + expires_in if expires_in is not None else None
+    creds = SimpleNamespace(
+        valid=valid,
+        expiry=expiry,
+        token="token",
+        refresh_token=refresh_token,
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="client",
+        client_secret="secret",
+        scopes=list(SCOPES),
+        rapt_token=None,
+        universe_domain=None,
+        account=None,
+        refreshed=False,
+    )
+
+    def refresh(request: object) -> None:
+        creds.token = "refreshed"
+        creds.expiry = _utcnow() + timedelta(hours=1)
+        creds.valid = True
+        creds.refreshed = True
+
+    creds.refresh = refresh
+    return creds
+
+
+@pytest.fixture
+def helper(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> OAuthHelper:
+    """Return a helper for an empty project directory with empty process-wide caches."""
+    monkeypatch.setattr(oauth_helper, "_credentials_cache", {})
+    monkeypatch.setattr(oauth_helper, "_token_stats", {})
+    monkeypatch.setattr(oauth_helper, "_refresh_failures", {})
+    monkeypatch.setattr(oauth_helper, "_auth_request", lambda: None)
+    helper = OAuthHelper(str(tmp_path))
+    # Tests must never open a browser for the interactive flow
+    monkeypatch.setattr(helper, "_run_oauth_flow", lambda: None)
+    return helper
+
+
+def _seed_cache(helper: OAuthHelper, creds: SimpleNamespace) -> None:
+    """Cache creds for helper as if they had just been loaded from its token.json."""
+    oauth_helper._credentials_cache[helper._cache_key] = creds
+    if helper.token_file.exists():
+        oauth_helper._token_stats[helper._cache_key] = oauth_helper._stat_key(helper.token_file)
+
+
+class TestCredentialState:
+    """Test classification of loaded credentials."""
+
+    @pytest.mark.parametrize(
+        ("creds", "state"),
+        [
+            (None, 0),
+            (_creds(), 1),
+            (_creds(expires_in=timedelta(hours=1)), 1),
+            (_creds(expires_in=timedelta(minutes=1), refresh_token="r"), 2),
+            (_creds(valid=False, refresh_token="r"), 2),
+            (_creds(expires_in=timedelta(minutes=1)), 1),
+            (_creds(valid=False), 3),
+        ],
+    )
+    def test_credential_state(self, creds: Optional[SimpleNamespace], state: int) -> None:
+        """Test the state code chosen for each kind of credentials."""
+        assert _credential_state(creds) == state
+
+
+class TestSerialize:
+    """Test encoding of credentials for token.json."""
+
+    def test_round_trip(self) -> None:
+        """Test that saved credentials load back with every field intact."""
+        credentials = pytest.importorskip("google.oauth2.credentials")
+        creds = credentials.Credentials(
+            token="token",
+            refresh_token="refresh",
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id="client",
+            client_secret="secret",
+            scopes=list(SCOPES),
+            expiry=datetime(2030, 1, 1, 12, 30),
+            rapt_token="rapt",
+            universe_domain="example.com",
+            account="user@example.com",
+        )
+        info = _json_loads(_serialize(creds))
+        loaded = credentials.Credentials.from_authorized_user_info(info, SCOPES)
+        for field in (
+            "token", "refresh_token", "token_uri", "client_id", "client_secret",
+            "expiry", "rapt_token", "universe_domain", "account",
+        ):
+            assert getattr(loaded, field) == getattr(creds, field), field
+        assert list(loaded.scopes) == list(SCOPES)
+
+    def test_unset_fields_are_omitted(self) -> None:
+        """Test that fields without a value are left out instead of written as null."""
+        credentials = pytest.importorskip("google.oauth2.credentials")
+        creds = credentials.Credentials(
+            token="token", refresh_token="refresh", client_id="client", client_secret="secret"
+        )
+        info = _json_loads(_serialize(creds))
+        assert None not in info.values()
+        assert "expiry" not in info
+        assert "rapt_token" not in info
+
+    def test_matches_to_json(self) -> None:
+        """Test that the encoded fields are the ones Credentials.to_json() writes."""
+        credentials = pytest.importorskip("google.oauth2.credentials")
+        creds = credentials.Credentials(
+            token="token",
+            refresh_token="refresh",
+            client_id="client",
+            client_secret="secret",
+            scopes=list(SCOPES),
+            expiry=datetime(2030, 1, 1, 12, 30),
+            rapt_token="rapt",
+        )
+        assert _json_loads(_serialize(creds)) == json.loads(creds.to_json())
+
+
+class TestExclusiveLock:
+    """Test the cross-process lock around token refreshes."""
+
+    def test_runs_unlocked_when_lock_file_cannot_be_opened(self, tmp_path: Path) -> None:
+        """Test that an unwritable lock location does not stop the block from running."""
+        ran = False
+        with _exclusive_lock(tmp_path / "missing" / "token.json.lock"):
+            ran = True
+        assert ran
+
+
+class TestGetCredentials:
+    """Test the in-process cache and when token.json is rewritten."""
+
+    def test_fresh_cached_credentials_skip_token_file(self, helper: OAuthHelper) -> None:
+        """Test that fresh cached credentials are returned without touching the disk."""
+        creds = _creds(expires_in=timedelta(hours=1))
+        _seed_cache(helper, creds)
+        assert helper.get_credentials() is creds
+        assert not helper.token_file.exists()
+        assert not helper.lock_file.exists()
+
+    def test_unchanged_token_file_is_not_reparsed_or_rewritten(self, helper: OAuthHelper) -> None:
+        """Test that a matching stat reuses the cached credentials and skips the save."""
+        pytest.importorskip("google.oauth2.credentials")
+        # Not valid JSON, so a re-read would fail and discard the credentials
+        helper.token_file.write_bytes(b"unparsed")
+        # Valid but inside the expiry buffer, with no refresh token to renew it
+        creds = _creds(expires_in=timedelta(minutes=1))
+        _seed_cache(helper, creds)
+        assert helper.get_credentials() is creds
+        assert helper.token_file.read_bytes() == b"unparsed"
+
+    def test_refresh_saves_token_file(self, helper: OAuthHelper) -> None:
+        """Test that refreshed credentials are written and their stat cached."""
+        pytest.importorskip("google.oauth2.credentials")
+        helper.token_file.write_bytes(b"{}")
+        creds = _creds(expires_in=timedelta(minutes=1), refresh_token="refresh")
+        _seed_cache(helper, creds)
+        assert helper.get_credentials() is creds
+        assert creds.refreshed
+        assert _json_loads(helper.token_file.read_bytes())["token"] == "refreshed"
+        assert oauth_helper._token_stats[helper._cache_key] == oauth_helper._stat_key(
+            helper.token_file
+        )
+
+    def test_failed_refresh_backs_off_while_token_is_valid(self, helper: OAuthHelper) -> None:
+        """Test that a failed refresh is not retried on every call while the token still works."""
+        pytest.importorskip("google.oauth2.credentials")
+        helper.token_file.write_bytes(b"{}")
+        creds = _creds(expires_in=timedelta(minutes=1), refresh_token="refresh")
+        attempts = []
+
+        def failing_refresh(request: object) -> None:
+            attempts.append(request)
+            raise RuntimeError("token endpoint unavailable")
+
+        creds.refresh = failing_refresh
+        _seed_cache(helper, creds)
+        assert helper.get_credentials() is creds
+        assert helper.get_credentials() is creds
+        assert len(attempts) == 1
+
+
+class TestGetCredentialsAsync:
+    """Test the event-loop friendly entry point."""
+
+    def test_concurrent_calls_share_one_load(
+        self, helper: OAuthHelper, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that concurrent awaiters wait for a single load/refresh and get its result."""
+        creds = _creds(expires_in=timedelta(hours=1))
+        loads = []
+
+        def load_refresh_save(cache_key, cached, cached_stat):
+            loads.append(cache_key)
+            # Long enough for every caller to queue up behind the first one
+            time.sleep(0.05)
+            oauth_helper._credentials_cache[cache_key] = creds
+            return creds
+
+        monkeypatch.setattr(helper, "_load_refresh_save", load_refresh_save)
+
+        async def run() -> list:
+            return await asyncio.gather(*(helper.get_credentials_async() for _ in range(5)))
+
+        results = asyncio.run(run())
+        assert len(loads) == 1
+        assert all(result is creds for result in results)
+
+
+class TestSaveCredentials:
+    """Test the atomic write of token.json."""
+
+    def test_writes_owner_only_file_without_leftovers(self, helper: OAuthHelper) -> None:
+        """Test that the token is written in full, readable by the owner only."""
+        creds = _creds(refresh_token="refresh")
+        helper._save_credentials(creds)
+        assert helper.token_file.read_bytes() == _serialize(creds)
+        assert list(helper.project_root.iterdir()) == [helper.token_file]
+        if os.name != "nt":
+            assert helper.token_file.stat().st_mode & 0o777 == 0o600
+
+    def test_failed_replace_keeps_previous_token(
+        self, helper: OAuthHelper, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that token.json is left intact when the new token cannot be swapped in."""
+        helper.token_file.write_bytes(b"previous")
+
+        def fail_replace(src: object, dst: object) -> None:
+            raise OSError("replace failed")
+
+        monkeypatch.setattr(oauth_helper.os, "replace", fail_replace)
+        helper._save_credentials(_creds(refresh_token="refresh"))
+        assert helper.token_file.read_bytes() == b"previous"